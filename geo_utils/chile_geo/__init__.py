@@ -0,0 +1,50 @@
+"""
+Python API over the chile_geo_spec dataset (regiones, provincias, comunas and localidades).
+
+Importing the package is cheap: submodules are imported, and the dataset loaded, only when
+one of the names below is first accessed.
+
+Usage example:
+import chile_geo
+
+dataset = chile_geo.get_dataset()
+print(dataset["13101"].nombre)
+"""
+
+import importlib
+
+# Public name -> submodule that defines it
+_LAZY_ATTRIBUTES = {
+    "AddressNormalizer": "normalize",
+    "Dataset": "dataset",
+    "HierarchyAggregator": "aggregate",
+    "Match": "search",
+    "Place": "dataset",
+    "PlaceSearchIndex": "search",
+    "ReverseGeocoder": "spatial",
+    "SpatialIndex": "spatial",
+    "TIPOS": "dataset",
+    "build_snapshot": "dataset",
+    "get_dataset": "dataset",
+    "get_reverse_geocoder": "spatial",
+    "get_search_index": "search",
+    "fold": "search",
+    "haversine_km": "spatial",
+    "load": "dataset",
+    "load_snapshot": "dataset",
+}
+
+__all__ = sorted(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
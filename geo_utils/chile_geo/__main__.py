@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+
+import argparse
+import json
+import sys
+import time
+
+from chile_geo import dataset as chile_geo_dataset
+
+
+def cmd_snapshot(args):
+    """
+    Rebuild the binary snapshot from the JSON sources.
+    """
+    start = time.perf_counter()
+    dataset = chile_geo_dataset.build_snapshot(args.data_dir, args.snapshot)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"✅ Snapshot written to {args.snapshot} ({len(dataset)} records, {elapsed:.1f} ms)")
+
+
+def cmd_get(args):
+    """
+    Print a record and its ancestor chain as JSON.
+    """
+    dataset = chile_geo_dataset.load(args.data_dir, args.snapshot)
+    if args.codigo not in dataset:
+        print(f"❌ Code '{args.codigo}' not found", file=sys.stderr)
+        sys.exit(1)
+    chain = [place.to_dict() for place in dataset.chain(args.codigo)]
+    print(json.dumps(chain, ensure_ascii=False, indent=2))
+
+
+def cmd_reverse(args):
+    """
+    Print the nearest comuna and localidad of a coordinate as JSON.
+    """
+    from chile_geo.spatial import ReverseGeocoder
+
+    geocoder = ReverseGeocoder(chile_geo_dataset.load(args.data_dir, args.snapshot))
+    if args.k > 1:
+        matches = geocoder.reverse_k(args.lat, args.lng, k=args.k, tipo=args.tipo)
+        output = [{"chain": [place.to_dict() for place in chain], "km": km} for chain, km in matches]
+    else:
+        result = geocoder.reverse(args.lat, args.lng)
+        output = {key: value.to_dict() if hasattr(value, "to_dict") else value for key, value in result.items()}
+    print(json.dumps(output, ensure_ascii=False, indent=2))
+
+
+def cmd_search(args):
+    """
+    Print the places whose name best matches a query.
+    """
+    from chile_geo.search import PlaceSearchIndex
+
+    index = PlaceSearchIndex(chile_geo_dataset.load(args.data_dir, args.snapshot))
+    matches = index.search(args.query, tipo=args.tipo, parent=args.parent, limit=args.limit)
+    if not matches:
+        print(f"❌ No place matches '{args.query}'", file=sys.stderr)
+        sys.exit(1)
+    for match in matches:
+        path = " > ".join(place.nombre for place in index.dataset.ancestors(match.place.codigo))
+        print(f"{match.score:.3f}\t{match.place.codigo}\t{match.place.tipo}\t{match.nombre}\t{path}")
+
+
+def main():
+    """
+    Command line entry point for the chile_geo package.
+
+    Usage:
+    - Rebuild the binary snapshot:
+      python -m chile_geo snapshot
+
+    - Show a record with its region/provincia chain:
+      python -m chile_geo get 13101
+
+    - Reverse geocode a coordinate (nearest comuna and localidad, or the k nearest):
+      python -m chile_geo reverse -- -33.45 -70.66
+      python -m chile_geo reverse --k 3 --tipo localidad -- -33.45 -70.66
+
+    - Fuzzy search a place name (accents and case are ignored):
+      python -m chile_geo search "Nunoa"
+      python -m chile_geo search "San Pedro" --tipo comuna --parent 13
+    """
+    parser = argparse.ArgumentParser(prog="chile_geo", description="chile_geo_spec dataset tools")
+    parser.add_argument("--data-dir", default=chile_geo_dataset.DATA_DIR, help="Directory with the chile_geo_spec JSON files")
+    parser.add_argument("--snapshot", default=chile_geo_dataset.SNAPSHOT_PATH, help="Path of the binary snapshot")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    snapshot_parser = subparsers.add_parser("snapshot", help="Rebuild the binary snapshot")
+    snapshot_parser.set_defaults(func=cmd_snapshot)
+
+    get_parser = subparsers.add_parser("get", help="Show a record and its ancestors")
+    get_parser.add_argument("codigo", help="Code of the region, provincia, comuna or localidad")
+    get_parser.set_defaults(func=cmd_get)
+
+    reverse_parser = subparsers.add_parser("reverse", help="Reverse geocode a coordinate")
+    reverse_parser.add_argument("lat", type=float, help="Latitude in degrees")
+    reverse_parser.add_argument("lng", type=float, help="Longitude in degrees")
+    reverse_parser.add_argument("--k", type=int, default=1, help="Number of nearest places to return")
+    reverse_parser.add_argument("--tipo", choices=["comuna", "localidad"], default="comuna", help="Level searched when --k is greater than 1")
+    reverse_parser.set_defaults(func=cmd_reverse)
+
+    search_parser = subparsers.add_parser("search", help="Fuzzy search a place name")
+    search_parser.add_argument("query", help="Place name, with or without accents")
+    search_parser.add_argument("--tipo", choices=list(chile_geo_dataset.TIPOS), help="Restrict results to one level")
+    search_parser.add_argument("--parent", help="Restrict results to places below this code")
+    search_parser.add_argument("--limit", type=int, default=5, help="Maximum number of results")
+    search_parser.set_defaults(func=cmd_search)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
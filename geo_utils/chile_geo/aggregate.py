@@ -0,0 +1,160 @@
+import numpy as np
+
+from chile_geo.dataset import get_dataset
+from chile_geo.spatial import SpatialIndex
+
+# Constants
+DEFAULT_CHUNK_SIZE = 1000000  # Points assigned per step; bounds memory to a few tens of MB regardless of input size
+
+
+class HierarchyAggregator:
+    """
+    Assign coordinates to their nearest comuna (or localidad) in bulk and roll counts and sums up the hierarchy.
+
+    The dataset has centroids, not boundaries, so "containment" is the nearest centroid by haversine distance.
+    Totals are accumulated per leaf with np.bincount; the rollup to provincia and region is a single bincount
+    per level over precomputed leaf -> ancestor index arrays.
+
+    Usage example:
+    aggregator = HierarchyAggregator(value_names=["amount"])
+
+    # Arrays can be huge (or np.memmap / np.load(..., mmap_mode="r")): they are processed chunk by chunk
+    aggregator.add(lats, lngs, amount=amounts)
+
+    totals = aggregator.rollup()
+    totals["region"]["codigo"], totals["region"]["count"], totals["region"]["amount"]
+    aggregator.to_rows("comuna")   # [{"codigo": ..., "nombre": ..., "count": ..., "amount": ...}, ...]
+    """
+
+    def __init__(self, dataset=None, leaf="comuna", value_names=(), max_km=None, use_scipy=True, workers=1):
+        """
+        :param dataset: Dataset to use. Defaults to the process-wide dataset.
+        :param leaf: Level points are assigned to: "comuna" or "localidad".
+        :param value_names: Names of the per-point values to sum (passed as keyword arrays to add()).
+        :param max_km: Points farther than this from every leaf are counted as unassigned.
+        :param use_scipy: Use SciPy's KD-tree when available.
+        :param workers: Threads used by the SciPy KD-tree query (-1 for all cores).
+        """
+        if leaf not in ("comuna", "localidad"):
+            raise ValueError("leaf must be 'comuna' or 'localidad'")
+        self.dataset = dataset if dataset is not None else get_dataset()
+        self.leaf = leaf
+        self.value_names = tuple(value_names)
+        self.max_km = max_km
+        self.workers = workers
+        self.index = SpatialIndex(self.dataset.by_tipo(leaf), use_scipy=use_scipy)
+
+        # Every level above the leaf, with a leaf position -> ancestor position array
+        leaves = self.index.places
+        self.levels = ("region", "provincia", leaf)
+        self._places = {tipo: self.dataset.by_tipo(tipo) for tipo in self.levels[:-1]}
+        self._places[leaf] = leaves
+        self._leaf_to = {}
+        for tipo in self.levels[:-1]:
+            position_of = {place.codigo: position for position, place in enumerate(self._places[tipo])}
+            self._leaf_to[tipo] = np.array(
+                [position_of[self.dataset.ancestor(place.codigo, tipo).codigo] for place in leaves], dtype=np.intp
+            )
+        self._leaf_to[leaf] = np.arange(len(leaves), dtype=np.intp)
+
+        self.reset()
+
+    def reset(self):
+        """
+        Clear the accumulated totals.
+        """
+        self.counts = np.zeros(len(self.index), dtype=np.int64)
+        self.sums = {name: np.zeros(len(self.index), dtype=np.float64) for name in self.value_names}
+        self.unassigned = 0
+
+    def assign(self, lats, lngs):
+        """
+        Get the leaf position of every coordinate (-1 when farther than max_km or not finite).
+        :return: NumPy array of positions into `self.index.places`.
+        """
+        positions, distances = self.index.query(lats, lngs, workers=self.workers)
+        if self.max_km is not None:
+            positions[distances > self.max_km] = -1
+        return positions
+
+    def add(self, lats, lngs, chunk_size=DEFAULT_CHUNK_SIZE, **values):
+        """
+        Assign points and accumulate their counts and values, chunk by chunk.
+        :param lats: Array-like of latitudes in degrees.
+        :param lngs: Array-like of longitudes in degrees.
+        :param chunk_size: Points processed per step.
+        :param values: One array per name in `value_names`, aligned with the coordinates.
+        """
+        unknown = set(values) - set(self.value_names)
+        if unknown:
+            raise ValueError(f"Unknown value names: {', '.join(sorted(unknown))}")
+        lats, lngs = np.asarray(lats), np.asarray(lngs)
+        for start in range(0, len(lats), chunk_size):
+            stop = start + chunk_size
+            positions = self.assign(lats[start:stop], lngs[start:stop])
+            valid = positions >= 0
+            if not valid.all():
+                self.unassigned += int((~valid).sum())
+                positions = positions[valid]
+            self.counts += np.bincount(positions, minlength=len(self.index))
+            for name, array in values.items():
+                chunk_values = np.asarray(array[start:stop], dtype=np.float64)
+                if not valid.all():
+                    chunk_values = chunk_values[valid]
+                self.sums[name] += np.bincount(positions, weights=chunk_values, minlength=len(self.index))
+
+    def add_chunks(self, chunks):
+        """
+        Accumulate an iterable of (lats, lngs, values) chunks, e.g. read from Parquet row groups or a database cursor.
+        :param chunks: Iterable of (lats, lngs) or (lats, lngs, {name: values}) tuples.
+        """
+        for chunk in chunks:
+            lats, lngs = chunk[0], chunk[1]
+            values = chunk[2] if len(chunk) > 2 else {}
+            self.add(lats, lngs, **values)
+
+    def merge(self, other):
+        """
+        Add the totals of another aggregator with the same leaf and value names (e.g. from another process).
+        """
+        if other.leaf != self.leaf or other.value_names != self.value_names:
+            raise ValueError("Cannot merge aggregators with different leaf levels or value names")
+        self.counts += other.counts
+        for name in self.value_names:
+            self.sums[name] += other.sums[name]
+        self.unassigned += other.unassigned
+
+    def rollup(self):
+        """
+        Get the totals of every level.
+        :return: Dictionary of tipo -> {"codigo": array, "count": array, <value name>: array}.
+        """
+        totals = {}
+        for tipo in self.levels:
+            size = len(self._places[tipo])
+            level = {
+                "codigo": np.array([place.codigo for place in self._places[tipo]]),
+                "count": np.bincount(self._leaf_to[tipo], weights=self.counts, minlength=size).astype(np.int64),
+            }
+            for name in self.value_names:
+                level[name] = np.bincount(self._leaf_to[tipo], weights=self.sums[name], minlength=size)
+            totals[tipo] = level
+        return totals
+
+    def to_rows(self, tipo, include_empty=False):
+        """
+        Get the totals of one level as a list of dictionaries, sorted by code.
+        :param tipo: "region", "provincia" or the leaf level.
+        :param include_empty: Include places without any point.
+        """
+        level = self.rollup()[tipo]
+        rows = []
+        for position, place in enumerate(self._places[tipo]):
+            count = int(level["count"][position])
+            if not count and not include_empty:
+                continue
+            row = {"codigo": place.codigo, "nombre": place.nombre, "count": count}
+            for name in self.value_names:
+                row[name] = float(level[name][position])
+            rows.append(row)
+        return sorted(rows, key=lambda row: row["codigo"])
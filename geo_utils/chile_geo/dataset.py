@@ -0,0 +1,314 @@
+import json
+import os
+import pickle
+import tempfile
+
+# Constants
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(os.path.dirname(PACKAGE_DIR), "chile_geo_spec")
+SNAPSHOT_PATH = os.environ.get("CHILE_GEO_SNAPSHOT", os.path.join(PACKAGE_DIR, "chile_geo.snapshot"))
+SNAPSHOT_VERSION = 2
+
+# Hierarchy levels, from the top down, and the file that holds each one
+TIPOS = ("region", "provincia", "comuna", "localidad")
+SOURCE_FILES = {
+    "region": "regiones.json",
+    "provincia": "provincias.json",
+    "comuna": "comunas.json",
+    "localidad": "localidades.json",
+}
+
+
+class Place:
+    """
+    A single record of the chile_geo_spec dataset (region, provincia, comuna or localidad).
+
+    Records are immutable by convention and use __slots__ to keep ~1.5k of them compact in memory.
+    `aliases` holds alternative names found for the same `codigo` (e.g. "Laja" and "La Laja").
+    """
+
+    __slots__ = ("codigo", "tipo", "nombre", "lat", "lng", "codigo_padre", "aliases")
+
+    def __init__(self, codigo, tipo, nombre, lat, lng, codigo_padre, aliases=()):
+        self.codigo = codigo
+        self.tipo = tipo
+        self.nombre = nombre
+        self.lat = lat
+        self.lng = lng
+        self.codigo_padre = codigo_padre
+        self.aliases = aliases
+
+    def __reduce__(self):
+        # Pickle as a plain constructor call, which is much faster to load than the slot state protocol
+        return (Place, (self.codigo, self.tipo, self.nombre, self.lat, self.lng, self.codigo_padre, self.aliases))
+
+    def __eq__(self, other):
+        return isinstance(other, Place) and self.codigo == other.codigo and self.tipo == other.tipo
+
+    def __hash__(self):
+        return hash((self.codigo, self.tipo))
+
+    def __repr__(self):
+        return f"Place(codigo={self.codigo!r}, tipo={self.tipo!r}, nombre={self.nombre!r})"
+
+    def to_dict(self):
+        """
+        Return the record as a dictionary with the same keys as the source JSON.
+        """
+        return {
+            "codigo": self.codigo,
+            "tipo": self.tipo,
+            "nombre": self.nombre,
+            "lat": self.lat,
+            "lng": self.lng,
+            "codigo_padre": self.codigo_padre,
+        }
+
+
+class Dataset:
+    """
+    In-memory, indexed view of the chile_geo_spec hierarchy.
+
+    The source data links records by `codigo` / `codigo_padre`:
+    region -> provincia -> comuna, and region -> provincia -> localidad
+    (localidades point at their provincia, not at a comuna).
+
+    Usage example:
+    dataset = get_dataset()
+
+    # O(1) lookup by code
+    comuna = dataset["13101"]
+
+    # Hierarchy navigation
+    dataset.parent("13101")               # Place for provincia "131"
+    dataset.ancestors("13101")            # (region, provincia)
+    dataset.children("131", "comuna")     # comunas of provincia "131"
+    dataset.ancestor("13101", "region")   # Place for region "13"
+    """
+
+    def __init__(self, places):
+        """
+        Build every index from an iterable of Place records.
+        :param places: Iterable of Place objects. Records sharing a `codigo` are merged into the first one as aliases.
+        """
+        by_code = {}
+        by_tipo = {tipo: [] for tipo in TIPOS}
+        for place in places:
+            existing = by_code.get(place.codigo)
+            if existing is not None:
+                if place.nombre != existing.nombre and place.nombre not in existing.aliases:
+                    existing.aliases = existing.aliases + (place.nombre,)
+                continue
+            by_code[place.codigo] = place
+            by_tipo[place.tipo].append(place)
+
+        self.places = by_code
+        self.regiones = tuple(by_tipo["region"])
+        self.provincias = tuple(by_tipo["provincia"])
+        self.comunas = tuple(by_tipo["comuna"])
+        self.localidades = tuple(by_tipo["localidad"])
+
+        # Children, grouped by tipo so callers don't have to filter mixed lists
+        children = {}
+        for place in by_code.values():
+            if place.codigo_padre in by_code:
+                children.setdefault(place.codigo_padre, {}).setdefault(place.tipo, []).append(place)
+        self._children = {
+            codigo: {tipo: tuple(items) for tipo, items in groups.items()}
+            for codigo, groups in children.items()
+        }
+
+        # Ancestor chains, top-down, resolved once per record
+        ancestors = {}
+        for tipo in TIPOS:
+            for place in by_tipo[tipo]:
+                parent = by_code.get(place.codigo_padre)
+                ancestors[place.codigo] = ancestors[parent.codigo] + (parent,) if parent is not None else ()
+        self._ancestors = ancestors
+
+    @classmethod
+    def from_json(cls, data_dir=DATA_DIR):
+        """
+        Parse the four chile_geo_spec JSON files.
+        :param data_dir: Directory containing regiones.json, provincias.json, comunas.json and localidades.json.
+        :return: A Dataset instance.
+        """
+        places = []
+        for tipo in TIPOS:
+            with open(os.path.join(data_dir, SOURCE_FILES[tipo]), encoding="utf-8") as f:
+                for item in json.load(f):
+                    places.append(Place(
+                        codigo=item["codigo"],
+                        tipo=item.get("tipo", tipo),
+                        nombre=item["nombre"],
+                        lat=float(item["lat"]),
+                        lng=float(item["lng"]),
+                        codigo_padre=item["codigo_padre"],
+                    ))
+        return cls(places)
+
+    # Lookups
+    def __getitem__(self, codigo):
+        return self.places[codigo]
+
+    def __contains__(self, codigo):
+        return codigo in self.places
+
+    def __iter__(self):
+        return iter(self.places.values())
+
+    def __len__(self):
+        return len(self.places)
+
+    def get(self, codigo, default=None):
+        """
+        Get a record by its code, or `default` if the code is unknown.
+        """
+        return self.places.get(codigo, default)
+
+    def by_tipo(self, tipo):
+        """
+        Get every record of a hierarchy level.
+        :param tipo: One of "region", "provincia", "comuna" or "localidad".
+        """
+        if tipo not in SOURCE_FILES:
+            raise ValueError(f"Unknown tipo '{tipo}'. Expected one of: {', '.join(TIPOS)}")
+        return getattr(self, SOURCE_FILES[tipo][:-len(".json")])
+
+    # Hierarchy
+    def parent(self, codigo):
+        """
+        Get the parent record of a code, or None for regions.
+        """
+        return self.places.get(self.places[codigo].codigo_padre)
+
+    def children(self, codigo, tipo=None):
+        """
+        Get the direct children of a code.
+        :param codigo: Code of the parent record.
+        :param tipo: Restrict the result to one level (e.g. "comuna"). All levels are returned when omitted.
+        :return: Tuple of Place objects.
+        """
+        groups = self._children.get(codigo, {})
+        if tipo is not None:
+            return groups.get(tipo, ())
+        return tuple(place for items in groups.values() for place in items)
+
+    def ancestors(self, codigo):
+        """
+        Get the ancestors of a code, from the region down to its direct parent.
+        """
+        return self._ancestors[codigo]
+
+    def chain(self, codigo):
+        """
+        Get the ancestors of a code followed by the record itself.
+        """
+        return self._ancestors[codigo] + (self.places[codigo],)
+
+    def ancestor(self, codigo, tipo):
+        """
+        Get the ancestor of a given level (or the record itself if it is of that level), or None.
+        """
+        for place in self.chain(codigo):
+            if place.tipo == tipo:
+                return place
+        return None
+
+    def descendants(self, codigo):
+        """
+        Get every record below a code, breadth first.
+        """
+        result = []
+        pending = [codigo]
+        while pending:
+            children = self.children(pending.pop(0))
+            result.extend(children)
+            pending.extend(child.codigo for child in children)
+        return tuple(result)
+
+
+# Snapshot
+def _source_fingerprint(data_dir):
+    """
+    Identify the JSON sources by size and modification time, so stale snapshots are detected with four stat() calls.
+    """
+    fingerprint = []
+    for tipo in TIPOS:
+        stat = os.stat(os.path.join(data_dir, SOURCE_FILES[tipo]))
+        fingerprint.append((SOURCE_FILES[tipo], stat.st_size, stat.st_mtime_ns))
+    return tuple(fingerprint)
+
+
+def build_snapshot(data_dir=DATA_DIR, snapshot_path=SNAPSHOT_PATH):
+    """
+    Parse the JSON sources and write a precompiled binary snapshot with every index already built.
+    :param data_dir: Directory containing the chile_geo_spec JSON files.
+    :param snapshot_path: Destination of the snapshot file.
+    :return: The Dataset that was written.
+    """
+    dataset = Dataset.from_json(data_dir)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(snapshot_path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            # A header of plain values comes first, so it can be checked without unpickling any Place
+            pickle.dump((SNAPSHOT_VERSION, _source_fingerprint(data_dir)), f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(dataset, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, snapshot_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    return dataset
+
+
+def load_snapshot(snapshot_path=SNAPSHOT_PATH, data_dir=DATA_DIR):
+    """
+    Load a snapshot written by build_snapshot().
+    :return: The Dataset, or None if the snapshot is missing, unreadable, from another version or older than the JSON sources.
+    """
+    try:
+        with open(snapshot_path, "rb") as f:
+            version, fingerprint = pickle.load(f)
+            if version != SNAPSHOT_VERSION or fingerprint != _source_fingerprint(data_dir):
+                return None
+            dataset = pickle.load(f)
+    except Exception:
+        # Any stale or corrupt snapshot (renamed classes, truncated file, old layout) is simply rebuilt
+        return None
+    return dataset if isinstance(dataset, Dataset) else None
+
+
+def load(data_dir=DATA_DIR, snapshot_path=SNAPSHOT_PATH, write_snapshot=True):
+    """
+    Load the dataset from its snapshot, falling back to the JSON sources.
+    :param data_dir: Directory containing the chile_geo_spec JSON files.
+    :param snapshot_path: Snapshot file to use, or None to always parse the JSON.
+    :param write_snapshot: Refresh the snapshot when it is missing or stale (errors writing it are ignored).
+    :return: A Dataset instance.
+    """
+    if snapshot_path:
+        dataset = load_snapshot(snapshot_path, data_dir)
+        if dataset is not None:
+            return dataset
+        if write_snapshot:
+            try:
+                return build_snapshot(data_dir, snapshot_path)
+            except OSError:
+                pass
+    return Dataset.from_json(data_dir)
+
+
+_dataset = None
+
+
+def get_dataset():
+    """
+    Get the process-wide Dataset, loading it on first use.
+    """
+    global _dataset
+    if _dataset is None:
+        _dataset = load()
+    return _dataset
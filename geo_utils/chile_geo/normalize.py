@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+
+import argparse
+import csv
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from functools import lru_cache
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet input is optional
+    pq = None
+
+from chile_geo.dataset import TIPOS, get_dataset
+from chile_geo.search import PlaceSearchIndex
+
+# Constants
+DEFAULT_CHUNK_SIZE = 50000  # Rows per task sent to a worker
+DEFAULT_MIN_SCORE = 0.75  # Minimum name similarity to accept a match
+RESOLVE_CACHE_SIZE = 65536  # Distinct (region, provincia, comuna, localidad) combinations cached per worker
+OUTPUT_COLUMNS = ["region_codigo", "provincia_codigo", "comuna_codigo", "localidad_codigo", "geo_lat", "geo_lng", "match_score", "match_source"]
+
+
+class AddressNormalizer:
+    """
+    Resolve address rows to chile_geo_spec codes and coordinates using the local dataset only.
+
+    Names are matched top-down (region, provincia, comuna, localidad), each level scoped by the previous one.
+    Rows whose comuna cannot be matched by name fall back to reverse geocoding when they carry coordinates;
+    as with names, the localidad is then searched only inside the comuna's provincia.
+
+    Usage example:
+    normalizer = AddressNormalizer(columns={"comuna": "city", "region": "state"})
+    output_rows = normalizer.normalize_rows(rows)   # rows: list of dicts, one per CSV line
+    """
+
+    def __init__(self, columns=None, lat_column=None, lng_column=None, min_score=DEFAULT_MIN_SCORE, localidad_max_km=None, dataset=None):
+        """
+        :param columns: Mapping of tipo ("region", "provincia", "comuna", "localidad") to the input column holding that name.
+        :param lat_column: Input column with the latitude, if any.
+        :param lng_column: Input column with the longitude, if any.
+        :param min_score: Minimum name similarity (0..1) to accept a match.
+        :param localidad_max_km: Reverse geocoded rows get no localidad when the nearest one of the provincia is farther than this.
+        :param dataset: Dataset to use. Defaults to the process-wide dataset.
+        """
+        self.dataset = dataset if dataset is not None else get_dataset()
+        self.search_index = PlaceSearchIndex(self.dataset)
+        self.columns = {tipo: column for tipo, column in (columns or {}).items() if column}
+        self.lat_column = lat_column
+        self.lng_column = lng_column
+        self.min_score = min_score
+        self.localidad_max_km = localidad_max_km
+        self._geocoder = None
+        self.resolve = lru_cache(maxsize=RESOLVE_CACHE_SIZE)(self._resolve)
+
+    @property
+    def geocoder(self):
+        """
+        ReverseGeocoder built on first use, so NumPy is only required when coordinates are used.
+        """
+        if self._geocoder is None:
+            from chile_geo.spatial import ReverseGeocoder
+            self._geocoder = ReverseGeocoder(self.dataset)
+        return self._geocoder
+
+    def _resolve(self, names):
+        """
+        Resolve a tuple of names (one per tipo, None when missing) to Place records.
+        :return: (places by tipo, lowest match score) or (places, None) when nothing matched.
+        """
+        places = dict.fromkeys(TIPOS)
+        scope = None
+        score = None
+        for tipo, name in zip(TIPOS, names):
+            if not name:
+                continue
+            # Comunas and localidades both hang from the provincia, so they share its scope
+            match = self.search_index.best(name, tipo=tipo, parent=scope, min_score=self.min_score)
+            if match is None:
+                continue
+            places[tipo] = match.place
+            score = match.score if score is None else min(score, match.score)
+            if tipo in ("region", "provincia"):
+                scope = match.place.codigo
+            elif tipo == "comuna":
+                scope = match.place.codigo_padre
+
+        # Fill the levels above the most specific match
+        for tipo in ("localidad", "comuna"):
+            if places[tipo] is not None:
+                for ancestor in self.dataset.ancestors(places[tipo].codigo):
+                    places[ancestor.tipo] = places[ancestor.tipo] or ancestor
+        if places["provincia"] is not None and places["region"] is None:
+            places["region"] = self.dataset.parent(places["provincia"].codigo)
+        return places, score
+
+    def normalize_rows(self, rows):
+        """
+        Resolve a chunk of rows.
+        :param rows: List of dicts keyed by input column name.
+        :return: List of lists with the values for OUTPUT_COLUMNS, aligned with `rows`.
+        """
+        results = []
+        pending_coordinates = []
+        for position, row in enumerate(rows):
+            names = tuple(self._name(row, tipo) for tipo in TIPOS)
+            places, score = self.resolve(names)
+            coordinates = self._coordinates(row)
+            if places["comuna"] is None and coordinates is not None:
+                pending_coordinates.append((position, coordinates))
+            results.append(self._output(places, score, "name" if score is not None else "", coordinates))
+
+        # Rows without a named comuna but with coordinates are reverse geocoded in one vectorized call
+        if pending_coordinates:
+            lats = [lat for _, (lat, _) in pending_coordinates]
+            lngs = [lng for _, (_, lng) in pending_coordinates]
+            batch = self.geocoder.reverse_batch(lats, lngs, localidad_max_km=self.localidad_max_km)
+            for i, (position, coordinates) in enumerate(pending_coordinates):
+                places = {
+                    "region": self.dataset[batch["region"][i]],
+                    "provincia": self.dataset[batch["provincia"][i]],
+                    "comuna": self.dataset[batch["comuna"][i]],
+                    "localidad": self.dataset.get(batch["localidad"][i]),  # Empty when none is in range
+                }
+                results[position] = self._output(places, None, "coordinates", coordinates)
+        return results
+
+    def _name(self, row, tipo):
+        value = row.get(self.columns[tipo]) if tipo in self.columns else None
+        return str(value).strip() or None if value is not None else None
+
+    def _coordinates(self, row):
+        if not self.lat_column or not self.lng_column:
+            return None
+        try:
+            lat, lng = float(row[self.lat_column]), float(row[self.lng_column])
+        except (KeyError, TypeError, ValueError):
+            return None
+        # "nan", "inf" and out-of-range values parse as floats but can't be geocoded
+        if not (math.isfinite(lat) and math.isfinite(lng) and -90 <= lat <= 90 and -180 <= lng <= 180):
+            return None
+        return lat, lng
+
+    def _output(self, places, score, source, coordinates):
+        if coordinates is None:
+            best = places["localidad"] or places["comuna"] or places["provincia"] or places["region"]
+            coordinates = (best.lat, best.lng) if best is not None else ("", "")
+        codes = [places[tipo].codigo if places[tipo] is not None else "" for tipo in TIPOS]
+        return codes + [coordinates[0], coordinates[1], "" if score is None else score, source]
+
+
+# Workers
+_normalizer = None
+
+
+def _init_worker(options):
+    """
+    Pool initializer. With the fork start method the parent's normalizer (dataset and indexes included)
+    is inherited as-is; other start methods build it once per worker, never per task.
+    """
+    global _normalizer
+    if _normalizer is None:
+        _normalizer = AddressNormalizer(**options)
+
+
+def _normalize_chunk(task):
+    """
+    Resolve one chunk in a worker and return it already encoded as CSV, so the parent only writes bytes.
+    """
+    chunk_index, fieldnames, rows, delimiter, write_header = task
+    output_rows = _normalizer.normalize_rows([dict(zip(fieldnames, row)) for row in rows])
+    lines = _CsvLines()
+    csv_writer = csv.writer(lines, delimiter=delimiter)
+    if write_header:
+        csv_writer.writerow(list(fieldnames) + OUTPUT_COLUMNS)
+    for row, output_row in zip(rows, output_rows):
+        csv_writer.writerow(list(row) + output_row)
+    return chunk_index, len(rows), lines.getvalue().encode("utf-8")
+
+
+class _CsvLines:
+    """
+    Minimal file-like buffer for csv.writer, joined once per chunk.
+    """
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, text):
+        self.parts.append(text)
+
+    def getvalue(self):
+        return "".join(self.parts)
+
+
+# Input
+def read_chunks(path, input_format, chunk_size, delimiter=","):
+    """
+    Stream an input file as (fieldnames, chunk of row value lists), without loading it whole.
+    """
+    if input_format == "parquet":
+        if pq is None:
+            raise RuntimeError("Reading Parquet files requires pyarrow: pip install pyarrow")
+        parquet_file = pq.ParquetFile(path)
+        fieldnames = parquet_file.schema_arrow.names
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            yield fieldnames, list(zip(*(column.to_pylist() for column in batch.columns)))
+        return
+
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f, delimiter=delimiter)
+        fieldnames = next(reader, None)
+        if fieldnames is None:
+            return
+        chunk = []
+        for row in reader:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield fieldnames, chunk
+                chunk = []
+        if chunk:
+            yield fieldnames, chunk
+
+
+# Checkpoints
+def read_checkpoint(path):
+    """
+    Read a checkpoint file, or None if there is none.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_checkpoint(path, checkpoint):
+    """
+    Atomically replace the checkpoint file.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def run(args):
+    """
+    Normalize an input file chunk by chunk over a process pool, writing results and a checkpoint after every chunk.
+    """
+    input_format = args.format or ("parquet" if args.input.lower().endswith((".parquet", ".pq")) else "csv")
+    checkpoint_path = f"{args.output}.checkpoint"
+    options = {
+        "columns": {tipo: getattr(args, f"{tipo}_column") for tipo in TIPOS},
+        "lat_column": args.lat_column,
+        "lng_column": args.lng_column,
+        "min_score": args.min_score,
+        "localidad_max_km": args.localidad_max_km,
+    }
+
+    # Resume from the last completed chunk, discarding anything written after it
+    start_chunk, rows_done, output_offset = 0, 0, 0
+    if args.resume:
+        checkpoint = read_checkpoint(checkpoint_path)
+        if checkpoint is not None:
+            if checkpoint.get("chunk_size") != args.chunk_size or checkpoint.get("input") != os.path.abspath(args.input):
+                sys.exit("❌ The checkpoint was written for another input or chunk size")
+            start_chunk, rows_done, output_offset = checkpoint["chunks"], checkpoint["rows"], checkpoint["offset"]
+            print(f"🔄 Resuming after chunk {start_chunk} ({rows_done} rows)", file=sys.stderr)
+
+    # Build the indexes before forking so workers inherit them
+    global _normalizer
+    _normalizer = AddressNormalizer(**options)
+
+    chunks = read_chunks(args.input, input_format, args.chunk_size, args.delimiter)
+    start = time.perf_counter()
+    rows_this_run = 0
+    with open(args.output, "r+b" if output_offset else "wb") as output, \
+            multiprocessing.Pool(args.workers, initializer=_init_worker, initargs=(options,)) as pool:
+        output.truncate(output_offset)
+        output.seek(output_offset)
+
+        def write_result(result):
+            nonlocal rows_done, rows_this_run
+            chunk_index, row_count, data = result
+            output.write(data)
+            output.flush()
+            os.fsync(output.fileno())
+            rows_done += row_count
+            rows_this_run += row_count
+            write_checkpoint(checkpoint_path, {
+                "input": os.path.abspath(args.input),
+                "chunk_size": args.chunk_size,
+                "chunks": chunk_index + 1,
+                "rows": rows_done,
+                "offset": output.tell(),
+            })
+            if not args.silent:
+                elapsed = time.perf_counter() - start
+                rate = rows_this_run / elapsed if elapsed else 0.0
+                sys.stderr.write(f"\rChunks: {chunk_index + 1} | Rows: {rows_done} | {rate:,.0f} rows/sec")
+                sys.stderr.flush()
+
+        # Keep a bounded number of chunks in flight so memory stays flat on arbitrarily large inputs.
+        # Results are written in input order, so the checkpoint always marks a chunk boundary.
+        in_flight = deque()
+        for chunk_index, (fieldnames, rows) in enumerate(chunks):
+            if chunk_index < start_chunk:
+                continue
+            task = (chunk_index, fieldnames, rows, args.delimiter, chunk_index == 0)
+            in_flight.append(pool.apply_async(_normalize_chunk, (task,)))
+            if len(in_flight) >= args.workers * 2:
+                write_result(in_flight.popleft().get())
+        while in_flight:
+            write_result(in_flight.popleft().get())
+
+    elapsed = time.perf_counter() - start
+    rate = rows_this_run / elapsed if elapsed else 0.0
+    if not args.silent:
+        sys.stderr.write("\n")
+    print(f"✅ {rows_done} rows written to {args.output} ({rows_this_run} in {elapsed:.1f} s, {rate:,.0f} rows/sec)", file=sys.stderr)
+
+
+def main():
+    """
+    Normalize address exports against the chile_geo_spec hierarchy.
+
+    Usage:
+    - Resolve the "comuna" and "region" columns of a CSV using 8 processes:
+      python -m chile_geo.normalize addresses.csv normalized.csv --workers 8
+
+    - Custom column names, with coordinates as a fallback:
+      python -m chile_geo.normalize export.parquet normalized.csv --comuna-column city --region-column state --lat-column latitude --lng-column longitude
+
+    - Continue after a crash from the last completed chunk:
+      python -m chile_geo.normalize addresses.csv normalized.csv --resume
+    """
+    parser = argparse.ArgumentParser(description="Normalize and geocode addresses against chile_geo_spec")
+    parser.add_argument("input", help="Input CSV or Parquet file")
+    parser.add_argument("output", help="Output CSV file (input columns plus the resolved codes and coordinates)")
+    parser.add_argument("--format", choices=["csv", "parquet"], help="Input format (detected from the extension by default)")
+    parser.add_argument("--delimiter", default=",", help="CSV delimiter for input and output")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows per chunk")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Number of worker processes")
+    parser.add_argument("--min-score", type=float, default=DEFAULT_MIN_SCORE, help="Minimum name similarity (0..1)")
+    for tipo in TIPOS:
+        parser.add_argument(f"--{tipo}-column", default=tipo, help=f"Input column with the {tipo} name")
+    parser.add_argument("--lat-column", default="lat", help="Input column with the latitude")
+    parser.add_argument("--lng-column", default="lng", help="Input column with the longitude")
+    parser.add_argument("--localidad-max-km", type=float, help="Leave the localidad of reverse geocoded rows empty beyond this distance")
+    parser.add_argument("--resume", action="store_true", help="Continue from the last completed chunk")
+    parser.add_argument("--silent", action="store_true", help="Do not print progress")
+    args = parser.parse_args()
+
+    if args.chunk_size < 1 or args.workers < 1:
+        parser.error("--chunk-size and --workers must be positive")
+    run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import heapq
+import re
+import unicodedata
+from collections import namedtuple
+from functools import lru_cache
+
+from chile_geo.dataset import get_dataset
+
+# Constants
+DEFAULT_CACHE_SIZE = 4096  # Distinct (query, filters) combinations kept by the LRU cache
+CANDIDATE_LIMIT = 24  # Entries ranked by edit distance after trigram filtering
+MIN_TRIGRAM_OVERLAP = 0.3  # Fraction of the query trigrams a candidate must share
+
+_APOSTROPHES = str.maketrans("", "", "'’‘`´")
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+Match = namedtuple("Match", ["place", "score", "nombre"])
+
+
+def fold(text):
+    """
+    Normalize a place name for comparison: lowercase, without accents, apostrophes or punctuation.
+    e.g. "Del Libertador Gral. Bernardo O’Higgins" -> "del libertador gral bernardo ohiggins", "Ñuñoa" -> "nunoa".
+    """
+    decomposed = unicodedata.normalize("NFKD", text.translate(_APOSTROPHES))
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return _NON_ALNUM.sub(" ", stripped.lower()).strip()
+
+
+def trigrams(folded):
+    """
+    Get the set of padded character trigrams of a folded string.
+    """
+    padded = f"  {folded} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def levenshtein(a, b):
+    """
+    Edit distance between two strings (insertions, deletions and substitutions).
+    Uses Myers' bit-parallel algorithm: one pass over `b` with Python integers as bit vectors of length len(a).
+    """
+    if not a:
+        return len(b)
+    peq = {}
+    for i, char in enumerate(a):
+        peq[char] = peq.get(char, 0) | (1 << i)
+    full = (1 << len(a)) - 1
+    last = 1 << (len(a) - 1)
+    pv, mv, distance = full, 0, len(a)
+    for char in b:
+        eq = peq.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & full)
+        mh = pv & xh
+        if ph & last:
+            distance += 1
+        elif mh & last:
+            distance -= 1
+        ph = ((ph << 1) | 1) & full
+        mh = (mh << 1) & full
+        pv = mh | (~(xv | ph) & full)
+        mv = ph & xv
+    return distance
+
+
+def similarity(a, b):
+    """
+    Edit distance normalized to 0..1, where 1 means identical.
+    """
+    longest = max(len(a), len(b))
+    return 1.0 - levenshtein(a, b) / longest if longest else 1.0
+
+
+class PlaceSearchIndex:
+    """
+    Accent-insensitive fuzzy search over the `nombre` of every region, provincia, comuna and localidad.
+
+    Names are folded (accents, case and punctuation removed), candidates are generated with a trigram
+    inverted index and ranked by edit distance. Queries are matched against the whole name and against
+    runs of consecutive words, so "Ohiggins" finds "Del Libertador Gral. Bernardo O’Higgins".
+
+    Usage example:
+    index = get_search_index()
+
+    index.search("Nunoa")                            # [Match(place=..., score=1.0, nombre="Ñuñoa"), ...]
+    index.search("Alhue", tipo="comuna", limit=1)
+    index.search("San Pedro", parent="13")           # Only places inside region "13"
+    index.best("Ohiggins", tipo="region")            # Best Match or None
+    """
+
+    def __init__(self, dataset=None, cache_size=DEFAULT_CACHE_SIZE):
+        """
+        :param dataset: Dataset to index. Defaults to the process-wide dataset.
+        :param cache_size: Maximum number of cached queries (0 disables the cache).
+        """
+        self.dataset = dataset if dataset is not None else get_dataset()
+
+        # One entry per name, aliases included: (place, nombre, folded words, ancestor codes)
+        self._entries = []
+        postings = {}
+        for place in self.dataset:
+            scope = frozenset(ancestor.codigo for ancestor in self.dataset.ancestors(place.codigo))
+            for nombre in (place.nombre,) + place.aliases:
+                folded = fold(nombre)
+                position = len(self._entries)
+                self._entries.append((place, nombre, tuple(folded.split()), scope))
+                for gram in trigrams(folded):
+                    postings.setdefault(gram, []).append(position)
+        self._postings = {gram: tuple(positions) for gram, positions in postings.items()}
+
+        self._cached_search = lru_cache(maxsize=cache_size)(self._search) if cache_size else self._search
+
+    def __len__(self):
+        return len(self._entries)
+
+    def search(self, query, tipo=None, parent=None, limit=5, min_score=0.5):
+        """
+        Find the places whose name best matches a query.
+        :param query: Free-text place name, with or without accents.
+        :param tipo: Restrict results to one level ("region", "provincia", "comuna" or "localidad").
+        :param parent: Restrict results to places below this `codigo` (e.g. a region or provincia code).
+        :param limit: Maximum number of results.
+        :param min_score: Minimum similarity (0..1) for a result to be returned.
+        :return: Tuple of Match(place, score, nombre), best first.
+        """
+        return self._cached_search(fold(query), tipo, parent, limit, min_score)
+
+    def best(self, query, tipo=None, parent=None, min_score=0.5):
+        """
+        Get the best Match for a query, or None.
+        """
+        matches = self.search(query, tipo=tipo, parent=parent, limit=1, min_score=min_score)
+        return matches[0] if matches else None
+
+    def cache_info(self):
+        """
+        Get the LRU cache statistics (hits, misses, maxsize, currsize), or None if caching is disabled.
+        """
+        return self._cached_search.cache_info() if hasattr(self._cached_search, "cache_info") else None
+
+    def _search(self, folded, tipo, parent, limit, min_score):
+        if not folded:
+            return ()
+
+        # Candidate generation: entries sharing the most trigrams with the query
+        query_grams = trigrams(folded)
+        counts = {}
+        for gram in query_grams:
+            for position in self._postings.get(gram, ()):
+                counts[position] = counts.get(position, 0) + 1
+        threshold = max(1, int(len(query_grams) * MIN_TRIGRAM_OVERLAP))
+        candidates = [
+            position for position, count in counts.items()
+            if count >= threshold and self._in_scope(position, tipo, parent)
+        ]
+        candidates = heapq.nlargest(CANDIDATE_LIMIT, candidates, key=lambda position: (counts[position], -len(self._entries[position][2])))
+
+        # Ranking: best edit-distance similarity against the name or a run of as many words as the query.
+        # Names repeat a lot (e.g. a comuna and its localidad), so similarities are memoized per query.
+        query_words = len(folded.split())
+        memo = {}
+
+        def score_of(text):
+            if text not in memo:
+                memo[text] = similarity(folded, text)
+            return memo[text]
+
+        best_by_place = {}
+        for position in candidates:
+            place, nombre, words, _ = self._entries[position]
+            whole = score_of(" ".join(words))
+            window = max(score_of(" ".join(words[i:i + query_words])) for i in range(max(1, len(words) - query_words + 1)))
+            score = max(window * (0.9 + 0.1 * whole), whole)
+            if score >= min_score and score > best_by_place.get(place, (0.0,))[0]:
+                best_by_place[place] = (score, nombre)
+
+        ranked = heapq.nlargest(limit, best_by_place.items(), key=lambda item: item[1][0])
+        return tuple(Match(place, round(score, 4), nombre) for place, (score, nombre) in ranked)
+
+    def _in_scope(self, position, tipo, parent):
+        place, _, _, scope = self._entries[position]
+        return (tipo is None or place.tipo == tipo) and (parent is None or parent in scope)
+
+
+_search_index = None
+
+
+def get_search_index():
+    """
+    Get the process-wide PlaceSearchIndex, building it on first use.
+    """
+    global _search_index
+    if _search_index is None:
+        _search_index = PlaceSearchIndex()
+    return _search_index
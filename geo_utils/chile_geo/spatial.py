@@ -0,0 +1,326 @@
+import numpy as np
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # SciPy is optional: fall back to a chunked brute-force search
+    cKDTree = None
+
+from chile_geo.dataset import get_dataset
+
+# Constants
+EARTH_RADIUS_KM = 6371.0088  # Mean Earth radius
+BRUTE_FORCE_CHUNK_CELLS = 1 << 22  # Max query x point distances held in memory at once by the fallback search
+
+
+def to_unit_vectors(lats, lngs):
+    """
+    Convert latitude/longitude arrays (degrees) to 3D points on the unit sphere.
+    Straight-line (chord) distance between these points grows monotonically with the haversine distance,
+    so a Euclidean nearest-neighbour search over them is exact.
+    """
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lng = np.radians(np.asarray(lngs, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.stack((cos_lat * np.cos(lng), cos_lat * np.sin(lng), np.sin(lat)), axis=-1)
+
+
+def chord_to_km(chord):
+    """
+    Convert unit-sphere chord lengths to great-circle distances in kilometers.
+    """
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.clip(np.asarray(chord) / 2.0, 0.0, 1.0))
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """
+    Great-circle distance in kilometers between two points (or broadcastable arrays of points).
+    """
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2.0) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2.0) ** 2
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _check_finite(lat, lng):
+    """
+    Single-point queries have no row to leave unresolved, so invalid coordinates are an error.
+    """
+    if not (np.isfinite(lat) and np.isfinite(lng)):
+        raise ValueError(f"Coordinates must be finite numbers, got ({lat}, {lng})")
+
+
+class SpatialIndex:
+    """
+    Nearest-neighbour index over a set of Place records, using haversine distances.
+
+    Points are stored as unit vectors in a KD-tree (scipy.spatial.cKDTree when SciPy is installed,
+    otherwise a chunked NumPy brute-force search over the same vectors).
+
+    Usage example:
+    index = SpatialIndex(get_dataset().comunas)
+
+    place, distance_km = index.nearest(-33.45, -70.66)
+    neighbours = index.k_nearest(-33.45, -70.66, k=3)
+
+    # Vectorized: arrays of positions into index.places and distances in km
+    positions, distances_km = index.query(lats, lngs)
+    """
+
+    def __init__(self, places, use_scipy=True):
+        """
+        :param places: Sequence of Place objects to index.
+        :param use_scipy: Use SciPy's KD-tree when available.
+        """
+        self.places = tuple(places)
+        if not self.places:
+            raise ValueError("Cannot build a spatial index without places")
+        self.codes = np.array([place.codigo for place in self.places])
+        self.points = to_unit_vectors([place.lat for place in self.places], [place.lng for place in self.places])
+        self._tree = cKDTree(self.points) if use_scipy and cKDTree is not None else None
+
+    def __len__(self):
+        return len(self.places)
+
+    def query(self, lats, lngs, k=1, workers=1):
+        """
+        Vectorized k-nearest query.
+        :param lats: Array-like of latitudes in degrees.
+        :param lngs: Array-like of longitudes in degrees, same shape as `lats`.
+        :param k: Number of neighbours per point.
+        :param workers: Threads used by the SciPy KD-tree (-1 for all cores). Ignored by the NumPy fallback.
+        :return: (positions, distances_km). Shape (n,) when k == 1, (n, k) otherwise, nearest first.
+                 Rows with a non-finite latitude or longitude get position -1 and distance inf.
+        """
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        k = min(k, len(self.places))
+        with np.errstate(invalid="ignore"):
+            vectors = to_unit_vectors(lats, lngs).reshape(-1, 3)
+
+        # One bad GPS ping must not fail the whole batch: only finite rows are searched
+        finite = np.isfinite(vectors).all(axis=1)
+        all_finite = finite.all()
+        searched = vectors if all_finite else vectors[finite]
+        if self._tree is not None:
+            chords, found = self._tree.query(searched, k=k, workers=workers)
+        else:
+            found, chords = self._brute_force(searched, k)
+        found = np.asarray(found, dtype=np.intp).reshape(-1, k)
+        chords = np.asarray(chords, dtype=np.float64).reshape(-1, k)
+        if all_finite:
+            positions, distances = found, chord_to_km(chords)
+        else:
+            positions = np.full((len(vectors), k), -1, dtype=np.intp)
+            distances = np.full((len(vectors), k), np.inf)
+            positions[finite] = found
+            distances[finite] = chord_to_km(chords)
+        if k == 1:
+            return positions.reshape(-1), distances.reshape(-1)
+        return positions.reshape(-1, k), distances.reshape(-1, k)
+
+    def _brute_force(self, vectors, k):
+        """
+        Exact search without SciPy: squared chord = 2 - 2 * dot, computed chunk by chunk to bound memory.
+        """
+        n = len(vectors)
+        positions = np.empty((n, k), dtype=np.intp)
+        chords = np.empty((n, k), dtype=np.float64)
+        chunk = max(1, BRUTE_FORCE_CHUNK_CELLS // len(self.points))
+        for start in range(0, n, chunk):
+            stop = min(start + chunk, n)
+            squared = 2.0 - 2.0 * (vectors[start:stop] @ self.points.T)
+            if k == 1:
+                best = np.argmin(squared, axis=1)[:, None]
+            else:
+                candidates = np.argpartition(squared, k - 1, axis=1)[:, :k] if k < len(self.points) else \
+                    np.broadcast_to(np.arange(len(self.points)), squared.shape)
+                order = np.argsort(np.take_along_axis(squared, candidates, axis=1), axis=1)
+                best = np.take_along_axis(candidates, order, axis=1)
+            positions[start:stop] = best
+            chords[start:stop] = np.sqrt(np.clip(np.take_along_axis(squared, best, axis=1), 0.0, None))
+        return positions, chords
+
+    def nearest(self, lat, lng):
+        """
+        Get the closest place to a coordinate.
+        :return: (Place, distance_km).
+        """
+        _check_finite(lat, lng)
+        positions, distances = self.query([lat], [lng])
+        return self.places[positions[0]], float(distances[0])
+
+    def k_nearest(self, lat, lng, k=5):
+        """
+        Get the k closest places to a coordinate, nearest first.
+        :return: List of (Place, distance_km).
+        """
+        _check_finite(lat, lng)
+        positions, distances = self.query([lat], [lng], k=k)
+        positions, distances = positions.reshape(-1), distances.reshape(-1)
+        return [(self.places[p], float(d)) for p, d in zip(positions, distances)]
+
+
+class ReverseGeocoder:
+    """
+    Offline reverse geocoding against the chile_geo_spec comunas and localidades.
+
+    Each coordinate is matched to its nearest comuna (with its provincia and region) and to the nearest
+    localidad of that comuna's provincia, so the four codes always form one chain. Localidades are only
+    linked to provincias in the source data, so the unrestricted nearest localidad can belong to another one.
+
+    Usage example:
+    geocoder = get_reverse_geocoder()
+
+    result = geocoder.reverse(-33.45, -70.66)
+    print(result["comuna"].nombre, result["region"].nombre)
+
+    # Millions of points at once (NumPy arrays in, NumPy arrays out)
+    batch = geocoder.reverse_batch(lats, lngs)
+    batch["comuna"], batch["provincia"], batch["region"], batch["localidad"]
+    """
+
+    def __init__(self, dataset=None, use_scipy=True):
+        """
+        :param dataset: Dataset to index. Defaults to the process-wide dataset.
+        :param use_scipy: Use SciPy's KD-tree when available.
+        """
+        self.dataset = dataset if dataset is not None else get_dataset()
+        self.comunas = SpatialIndex(self.dataset.comunas, use_scipy=use_scipy)
+        self.localidades = SpatialIndex(self.dataset.localidades, use_scipy=use_scipy)
+
+        # Parent codes aligned with the index positions, so batch results are plain fancy indexing
+        self._comuna_provincia = np.array([self.dataset.ancestor(c, "provincia").codigo for c in self.comunas.codes])
+        self._comuna_region = np.array([self.dataset.ancestor(c, "region").codigo for c in self.comunas.codes])
+
+        # One localidad index per provincia, with its positions into `self.localidades`
+        provincia_codes = sorted(set(self._comuna_provincia))
+        provincia_number = {codigo: number for number, codigo in enumerate(provincia_codes)}
+        self._comuna_provincia_number = np.array([provincia_number[c] for c in self._comuna_provincia], dtype=np.intp)
+        grouped = {}
+        for position, place in enumerate(self.localidades.places):
+            provincia = self.dataset.ancestor(place.codigo, "provincia")
+            if provincia is not None:
+                grouped.setdefault(provincia.codigo, []).append(position)
+        self._provincia_localidades = [
+            (SpatialIndex([self.localidades.places[p] for p in grouped[codigo]], use_scipy=use_scipy),
+             np.array(grouped[codigo], dtype=np.intp))
+            if codigo in grouped else None
+            for codigo in provincia_codes
+        ]
+        self._provincia_number = provincia_number
+
+    def reverse(self, lat, lng, localidad_max_km=None):
+        """
+        Reverse geocode a single coordinate.
+        :param localidad_max_km: Leave the localidad empty when the nearest one of the provincia is farther than this.
+        :return: Dictionary with the region, provincia, comuna and localidad Place objects and the distances in km.
+                 The localidad is the nearest one inside the comuna's provincia (None, with distance None, if there is none).
+        """
+        comuna, comuna_km = self.comunas.nearest(lat, lng)
+        region, provincia = self.dataset.ancestors(comuna.codigo)
+        localidad, localidad_km = self.nearest_localidad(lat, lng, provincia.codigo)
+        if localidad_max_km is not None and localidad is not None and localidad_km > localidad_max_km:
+            localidad, localidad_km = None, None
+        return {
+            "region": region,
+            "provincia": provincia,
+            "comuna": comuna,
+            "comuna_km": comuna_km,
+            "localidad": localidad,
+            "localidad_km": localidad_km,
+        }
+
+    def nearest_localidad(self, lat, lng, provincia=None):
+        """
+        Get the closest localidad to a coordinate.
+        :param provincia: Only consider the localidades of this provincia code. All of them are considered when omitted.
+        :return: (Place, distance_km), or (None, None) if the provincia has no localidades.
+        """
+        if provincia is None:
+            return self.localidades.nearest(lat, lng)
+        number = self._provincia_number.get(provincia)
+        entry = self._provincia_localidades[number] if number is not None else None
+        if entry is None:
+            return None, None
+        return entry[0].nearest(lat, lng)
+
+    def reverse_k(self, lat, lng, k=5, tipo="comuna"):
+        """
+        Get the k nearest comunas (or localidades) of a coordinate with their full chain.
+        :return: List of (chain, distance_km), where chain is (region, provincia, place).
+        """
+        index = self.comunas if tipo == "comuna" else self.localidades
+        return [(self.dataset.chain(place.codigo), km) for place, km in index.k_nearest(lat, lng, k)]
+
+    def reverse_batch(self, lats, lngs, localidad_max_km=None):
+        """
+        Vectorized reverse geocoding.
+        :param lats: Array-like of latitudes in degrees.
+        :param lngs: Array-like of longitudes in degrees.
+        :param localidad_max_km: Leave the localidad empty when the nearest one of the provincia is farther than this.
+        :return: Dictionary of NumPy arrays with the region, provincia, comuna and localidad codes and distances in km.
+                 The localidad is the nearest one inside the comuna's provincia.
+                 Rows with non-finite coordinates get empty codes and distance inf.
+        """
+        lats = np.asarray(lats, dtype=np.float64).reshape(-1)
+        lngs = np.asarray(lngs, dtype=np.float64).reshape(-1)
+        comuna_pos, comuna_km = self.comunas.query(lats, lngs)
+        localidad_pos, localidad_km = self._query_localidades(lats, lngs, comuna_pos)
+        if localidad_max_km is not None:
+            localidad_pos[localidad_km > localidad_max_km] = -1
+        region = self._comuna_region[comuna_pos]
+        provincia = self._comuna_provincia[comuna_pos]
+        comuna = self.comunas.codes[comuna_pos]
+        localidad = self.localidades.codes[localidad_pos]
+        localidad[localidad_pos < 0] = ""
+        # Non-finite coordinates come back as position -1: report them with empty codes
+        unresolved = comuna_pos < 0
+        if unresolved.any():
+            for codes in (region, provincia, comuna):
+                codes[unresolved] = ""
+        return {
+            "region": region,
+            "provincia": provincia,
+            "comuna": comuna,
+            "comuna_km": comuna_km,
+            "localidad": localidad,
+            "localidad_km": localidad_km,
+        }
+
+
+    def _query_localidades(self, lats, lngs, comuna_pos):
+        """
+        Find the nearest localidad of each row inside the provincia of its comuna, one index query per provincia.
+        :return: (positions into `self.localidades`, distances_km), with -1 / inf where there is none.
+        """
+        positions = np.full(len(comuna_pos), -1, dtype=np.intp)
+        distances = np.full(len(comuna_pos), np.inf)
+        rows = np.flatnonzero(comuna_pos >= 0)
+        numbers = self._comuna_provincia_number[comuna_pos[rows]]
+        # Sort the rows by provincia once, then slice each group instead of comparing every row per provincia
+        order = np.argsort(numbers, kind="stable")
+        rows, bounds = rows[order], np.cumsum(np.bincount(numbers, minlength=len(self._provincia_localidades)))
+        start = 0
+        for number, stop in enumerate(bounds):
+            group = rows[start:stop]
+            start = stop
+            entry = self._provincia_localidades[number]
+            if entry is None or not len(group):
+                continue
+            index, global_positions = entry
+            found, km = index.query(lats[group], lngs[group])
+            positions[group] = global_positions[found]
+            distances[group] = km
+        return positions, distances
+
+
+_reverse_geocoder = None
+
+
+def get_reverse_geocoder():
+    """
+    Get the process-wide ReverseGeocoder, building it on first use.
+    """
+    global _reverse_geocoder
+    if _reverse_geocoder is None:
+        _reverse_geocoder = ReverseGeocoder()
+    return _reverse_geocoder
@@ -0,0 +1,253 @@
+import ipaddress
+import shutil
+import socket
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psutil
+
+# Constants
+DEFAULT_LOOKUP_WORKERS = 8  # Concurrent reverse DNS / WHOIS lookups
+DEFAULT_MAX_PENDING_LOOKUPS = 256  # Lookups queued or running at once; bounds the backlog after a burst of new addresses
+DEFAULT_LOOKUP_TTL = 3600  # Seconds a lookup result is reused across passes
+DEFAULT_SEEN_TTL = 86400  # Seconds a connection stays "known" after it was last seen
+WHOIS_TIMEOUT = 10  # Seconds
+WHOIS_FIELDS = ("orgname", "org-name", "organization", "netname", "descr", "country")
+
+
+class TTLCache:
+    """
+    Thread-safe dictionary whose entries expire after a fixed number of seconds.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                return default
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def __contains__(self, key):
+        return self.get(key, self) is not self
+
+    def purge(self):
+        """
+        Drop expired entries.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for key in [key for key, (expires, _) in self._data.items() if expires < now]:
+                del self._data[key]
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ConnectionWatcher:
+    """
+    Collector that watches established network connections and reports new ones with no reverse DNS.
+
+    Each pass reads the socket table once, de-duplicates the remote addresses and resolves reverse DNS
+    (and optionally WHOIS) on a bounded thread pool. Lookups never block a pass: addresses still being
+    resolved are evaluated once their lookup finishes (even if the connection has closed by then),
+    and results are cached for `lookup_ttl` seconds. At most `max_pending` lookups are queued at once: addresses
+    beyond that are skipped for the pass and picked up on a later one if the connection is still open.
+    Only connections not seen before (process and remote address) produce alerts.
+
+    Usage example:
+    watcher = ConnectionWatcher(lookup_workers=8)
+
+    for message in watcher.collect():
+        print(message)
+
+    watcher.close()   # Cancel queued lookups, so the interpreter does not wait for them at exit
+    """
+
+    def __init__(self, lookup_workers=DEFAULT_LOOKUP_WORKERS, lookup_ttl=DEFAULT_LOOKUP_TTL, seen_ttl=DEFAULT_SEEN_TTL, use_whois=True,
+                 max_pending=DEFAULT_MAX_PENDING_LOOKUPS):
+        """
+        :param lookup_workers: Maximum number of concurrent lookups.
+        :param max_pending: Maximum number of lookups queued or running at once.
+        :param lookup_ttl: Seconds a reverse DNS / WHOIS result is cached.
+        :param seen_ttl: Seconds a connection is remembered after it was last seen.
+        :param use_whois: Run `whois` for addresses without reverse DNS (only if the command is installed).
+        """
+        self.executor = ThreadPoolExecutor(max_workers=lookup_workers, thread_name_prefix="lookup")
+        self.lookups = TTLCache(lookup_ttl)
+        self.seen = TTLCache(seen_ttl)
+        self.whois_path = shutil.which("whois") if use_whois else None
+        self.max_pending = max_pending
+        self.skipped_lookups = 0  # Addresses not looked up because the queue was full
+        self._pending = {}
+        self._waiting = {}  # Address -> {(process name, address): (pid, port)} seen while its lookup was pending
+
+    # Socket table
+    def get_connections(self):
+        """
+        Read the socket table once.
+        :return: List of psutil connections, or None if access is denied.
+        """
+        try:
+            return psutil.net_connections(kind="inet")
+        except psutil.AccessDenied:
+            return None
+
+    def get_process_name(self, pid, names):
+        """
+        Get the name of a process.
+        :param names: PID -> name cache for the current pass (PIDs are reused, so it is not kept across passes).
+        """
+        if pid is None:
+            return "unknown"
+        name = names.get(pid)
+        if name is None:
+            try:
+                name = psutil.Process(pid).name()
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                name = "unknown"
+            names[pid] = name
+        return name
+
+    # Lookups
+    def reverse_dns(self, address):
+        """
+        Resolve the hostname of an IP address, or None.
+        """
+        try:
+            return socket.gethostbyaddr(address)[0]
+        except (socket.herror, socket.gaierror, OSError):
+            return None
+
+    def whois(self, address):
+        """
+        Get a short summary (organization, network name, country) of the WHOIS record of an address, or None.
+        """
+        if not self.whois_path:
+            return None
+        try:
+            output = subprocess.run(
+                [self.whois_path, address], capture_output=True, text=True, timeout=WHOIS_TIMEOUT
+            ).stdout
+        except (subprocess.SubprocessError, OSError):
+            return None
+        summary = {}
+        for line in output.splitlines():
+            key, _, value = line.partition(":")
+            key, value = key.strip().lower(), value.strip()
+            if key in WHOIS_FIELDS and value and key not in summary:
+                summary[key] = value
+        return ", ".join(summary.values()) or None
+
+    def _lookup(self, address):
+        hostname = self.reverse_dns(address)
+        return {"hostname": hostname, "whois": None if hostname else self.whois(address)}
+
+    def _collect_lookups(self):
+        """
+        Move finished lookups from the pending futures into the TTL cache and evaluate the connections waiting on them.
+        :return: List of alert messages.
+        """
+        alerts = []
+        for address, future in list(self._pending.items()):
+            if future.done():
+                del self._pending[address]
+                try:
+                    result = future.result()
+                except Exception:
+                    result = {"hostname": None, "whois": None}
+                self.lookups.set(address, result)
+                # Short-lived connections may be gone by now, but they were still made
+                for key, (pid, port) in self._waiting.pop(address, {}).items():
+                    alert = self._evaluate(key, pid, port, result)
+                    if alert:
+                        alerts.append(alert)
+        return alerts
+
+    def _evaluate(self, key, pid, port, result):
+        """
+        Mark a connection as seen.
+        :return: Alert message if it is new and its remote address has no reverse DNS, otherwise None.
+        """
+        is_new = key not in self.seen
+        self.seen.set(key, True)
+        if not is_new or result["hostname"]:
+            return None
+        process_name, address = key
+        details = f"WHOIS: {result['whois']}" if result["whois"] else "no DNS resolution"
+        return f"Alert: {process_name} (PID: {pid}) connected to {address}:{port} ({details})"
+
+    # Collection
+    def collect(self, connections=None):
+        """
+        Run one pass.
+        :param connections: Socket table already read by the caller (read here when omitted).
+        :return: List of alert messages for new connections whose remote address has no reverse DNS.
+        """
+        if connections is None:
+            connections = self.get_connections()
+        if connections is None:
+            return []
+
+        alerts = self._collect_lookups()
+
+        # One entry per (process, remote address); each address is looked up once.
+        # The remote port is not part of the key, since inbound clients use a new ephemeral port per connection.
+        current = {}
+        names = {}
+        for connection in connections:
+            if not connection.raddr:
+                continue
+            address = connection.raddr.ip
+            try:
+                ip = ipaddress.ip_address(address.split("%", 1)[0])
+            except ValueError:
+                continue
+            if ip.is_loopback or ip.is_unspecified:
+                continue
+            key = (self.get_process_name(connection.pid, names), address)
+            current.setdefault(key, (connection.pid, connection.raddr.port))
+
+        skipped = set()
+        for address in {address for _, address in current}:
+            if address not in self.lookups and address not in self._pending:
+                if len(self._pending) >= self.max_pending:
+                    skipped.add(address)
+                    continue
+                self._pending[address] = self.executor.submit(self._lookup, address)
+        self.skipped_lookups += len(skipped)
+
+        for key, (pid, port) in current.items():
+            address = key[1]
+            if address in skipped:
+                continue  # Queue full: looked up on a later pass if the connection is still open
+            result = self.lookups.get(address)
+            if result is None:
+                # Still resolving: evaluated when the lookup finishes
+                self._waiting.setdefault(address, {}).setdefault(key, (pid, port))
+                continue
+            alert = self._evaluate(key, pid, port, result)
+            if alert:
+                alerts.append(alert)
+
+        self.lookups.purge()
+        self.seen.purge()
+        return alerts
+
+    def close(self):
+        """
+        Stop the lookup thread pool, cancelling queued lookups (running ones finish within WHOIS_TIMEOUT).
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self._pending.clear()
+        self._waiting.clear()
@@ -4,6 +4,7 @@ import time
 import os
 import sys
 import argparse
+from connection_watcher import ConnectionWatcher
 
 # Constants
 SLACK_WEBHOOK_URL = os.environ.get("SLACK_WEBHOOK_URL")  # Store webhook URL in environment variable
@@ -13,13 +14,16 @@ RAM_THRESHOLD = int(os.environ.get("RAM_THRESHOLD", 90))  # Percentage
 SWAP_THRESHOLD = int(os.environ.get("SWAP_THRESHOLD", 90))  # Percentage
 NET_CONNECTIONS_THRESHOLD = int(os.environ.get("NET_CONNECTIONS_THRESHOLD", 100))  # Number of connections
 CHECK_INTERVAL = int(os.environ.get("CHECK_INTERVAL", 5))  # Seconds
+LOOKUP_WORKERS = int(os.environ.get("LOOKUP_WORKERS", 8))  # Concurrent reverse DNS / WHOIS lookups
+LOOKUP_CACHE_TTL = int(os.environ.get("LOOKUP_CACHE_TTL", 3600))  # Seconds
+MAX_PENDING_LOOKUPS = int(os.environ.get("MAX_PENDING_LOOKUPS", 256))  # Lookups queued at once
 
 class ResourceMonitor:
     """
     A class to monitor system resources (CPU, Disk, RAM, Network I/O, Disk I/O, Temperature, Swap, Active Connections, Running Processes) and send alerts to Slack.
     """
 
-    def __init__(self, slack_webhook_url, cpu_threshold, disk_threshold, ram_threshold, check_interval, swap_threshold, net_connections_threshold, silent_mode=False):
+    def __init__(self, slack_webhook_url, cpu_threshold, disk_threshold, ram_threshold, check_interval, swap_threshold, net_connections_threshold, silent_mode=False, connection_watcher=None):
         self.slack_webhook_url = slack_webhook_url
         self.cpu_threshold = cpu_threshold
         self.disk_threshold = disk_threshold
@@ -28,6 +32,7 @@ class ResourceMonitor:
         self.net_connections_threshold = net_connections_threshold
         self.check_interval = check_interval
         self.silent_mode = silent_mode
+        self.connection_watcher = connection_watcher
         self.prev_net_io = psutil.net_io_counters()
         self.prev_disk_io = psutil.disk_io_counters()
 
@@ -104,15 +109,35 @@ class ResourceMonitor:
         self.prev_net_io = net_io
         return bytes_sent, bytes_recv
 
-    def get_active_connections(self):
+    def get_connections(self):
         """
-        Get the number of active network connections.
+        Read the socket table once per pass.
         """
         try:
-            connections = psutil.net_connections()
-            return len(connections)
+            return psutil.net_connections()
         except psutil.AccessDenied:
+            return None
+
+    def get_active_connections(self, connections=None):
+        """
+        Get the number of active network connections.
+        """
+        if connections is None:
+            connections = self.get_connections()
+        if connections is None:
             return "Access Denied"
+        return len(connections)
+
+    def check_new_connections(self, connections):
+        """
+        Send an alert for every new connection to an address without reverse DNS.
+        """
+        if self.connection_watcher is None or connections is None:
+            return 0
+        alerts = self.connection_watcher.collect(connections)
+        for message in alerts:
+            self.send_slack_alert(message)
+        return len(alerts)
 
     # Alerts
     def send_slack_alert(self, message):
@@ -170,7 +195,9 @@ class ResourceMonitor:
 
             # Network
             net_io_sent, net_io_recv = self.get_network_io()
-            active_connections = self.get_active_connections()
+            connections = self.get_connections()
+            active_connections = self.get_active_connections(connections)
+            new_connection_alerts = self.check_new_connections(connections)
 
             # Human-readable formats
             net_io_sent_hr = self.human_readable_size(net_io_sent)
@@ -186,7 +213,7 @@ class ResourceMonitor:
                 sys.stdout.write(f"\rCPU Usage: {cpu_usage}% | CPU Temp: {cpu_temp}°C | Running Processes: {running_processes}\n")
                 sys.stdout.write(f"\rDisk Usage: {disk_usage}% | Disk I/O Read: {disk_io_read_hr} | Disk I/O Write: {disk_io_write_hr}\n")
                 sys.stdout.write(f"\rRAM Usage: {ram_usage}% | Swap Usage: {swap_usage}%\n")
-                sys.stdout.write(f"\rNet I/O Sent: {net_io_sent_hr} | Net I/O Recv: {net_io_recv_hr} | Active Connections: {active_connections}\n")
+                sys.stdout.write(f"\rNet I/O Sent: {net_io_sent_hr} | Net I/O Recv: {net_io_recv_hr} | Active Connections: {active_connections} | New Connection Alerts: {new_connection_alerts}\n")
                 sys.stdout.flush()
 
             self.check_and_alert("CPU Usage", cpu_usage, self.cpu_threshold)
@@ -200,8 +227,13 @@ class ResourceMonitor:
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Monitor system resources and send alerts to Slack.")
     parser.add_argument('--silent', action='store_true', help="Run in silent mode (no console output)")
+    parser.add_argument('--watch-connections', action='store_true', help="Alert on new connections to addresses without reverse DNS")
     args = parser.parse_args()
 
+    connection_watcher = None
+    if args.watch_connections:
+        connection_watcher = ConnectionWatcher(lookup_workers=LOOKUP_WORKERS, lookup_ttl=LOOKUP_CACHE_TTL, max_pending=MAX_PENDING_LOOKUPS)
+
     monitor = ResourceMonitor(
         slack_webhook_url=SLACK_WEBHOOK_URL,
         cpu_threshold=CPU_THRESHOLD,
@@ -210,6 +242,12 @@ if __name__ == "__main__":
         swap_threshold=SWAP_THRESHOLD,
         net_connections_threshold=NET_CONNECTIONS_THRESHOLD,
         check_interval=CHECK_INTERVAL,
-        silent_mode=args.silent
+        silent_mode=args.silent,
+        connection_watcher=connection_watcher
     )
-    monitor.monitor_resources()
\ No newline at end of file
+    try:
+        monitor.monitor_resources()
+    finally:
+        # Queued lookups would otherwise keep the interpreter alive after Ctrl+C
+        if connection_watcher is not None:
+            connection_watcher.close()
\ No newline at end of file
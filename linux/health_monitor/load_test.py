@@ -0,0 +1,427 @@
+import argparse
+import asyncio
+import math
+import ssl
+import sys
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+# Constants
+DEFAULT_CONCURRENCY = 50  # Open connections (and requests in flight)
+DEFAULT_DURATION = 10  # Seconds
+DEFAULT_TIMEOUT = 10  # Seconds per request
+CONNECT_FAILURES_BEFORE_BACKOFF = 3  # Consecutive failed connects before a closed-loop connection starts backing off
+MAX_CONNECT_BACKOFF = 1.0  # Seconds; the backoff doubles from 10 ms up to this
+HISTOGRAM_SUB_BUCKET_BITS = 8  # Linear sub-buckets per power of two (2 ** 8): < 1% relative error
+
+# Colors
+GREEN = "\033[0;32m"
+RED = "\033[0;31m"
+NC = "\033[0m"  # No Color
+
+
+class LatencyHistogram:
+    """
+    HDR-style latency histogram with log-linear buckets over integer microseconds.
+
+    Every power of two is split into 2 ** HISTOGRAM_SUB_BUCKET_BITS linear sub-buckets, so recording is O(1),
+    memory is a few KB regardless of the number of samples, and percentiles have < 1% relative error.
+    """
+
+    def __init__(self, sub_bucket_bits=HISTOGRAM_SUB_BUCKET_BITS):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.counts = Counter()
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self.sum = 0
+
+    def _index(self, value):
+        shift = max(0, value.bit_length() - self.sub_bucket_bits)
+        return (shift << self.sub_bucket_bits) + (value >> shift)
+
+    def _upper_bound(self, index):
+        shift, sub_bucket = divmod(index, 1 << self.sub_bucket_bits)
+        return ((sub_bucket + 1) << shift) - 1
+
+    def record(self, microseconds):
+        """
+        Record one latency sample, in microseconds.
+        """
+        value = max(0, int(microseconds))
+        self.counts[self._index(value)] += 1
+        self.total += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        self.min = value if self.min is None else min(self.min, value)
+
+    def merge(self, other):
+        """
+        Add the samples of another histogram with the same precision.
+        """
+        self.counts.update(other.counts)
+        self.total += other.total
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+
+    def percentile(self, percent):
+        """
+        Get the latency (microseconds) at or below which `percent` % of the samples fall.
+        """
+        if not self.total:
+            return 0
+        target = max(1, math.ceil(self.total * percent / 100.0))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._upper_bound(index), self.max)
+        return self.max
+
+    def mean(self):
+        """
+        Get the mean latency in microseconds.
+        """
+        return self.sum / self.total if self.total else 0.0
+
+
+class HttpConnection:
+    """
+    Minimal keep-alive HTTP/1.1 client connection over asyncio streams.
+    One request at a time; the socket is reused until the server closes it.
+    """
+
+    def __init__(self, host, port, use_ssl, timeout):
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl.create_default_context() if use_ssl else None
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+        self.connects = 0
+        self.connect_failures = 0  # Consecutive failed connects
+
+    async def _open(self):
+        try:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl_context)
+        except BaseException:
+            self.connect_failures += 1
+            raise
+        self.connects += 1
+        self.connect_failures = 0
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def request(self, payload, is_head=False):
+        """
+        Send a pre-encoded request and read the whole response.
+        :return: HTTP status code.
+        """
+        try:
+            return await asyncio.wait_for(self._request(payload, is_head), self.timeout)
+        except BaseException:
+            self.close()
+            raise
+
+    async def _request(self, payload, is_head):
+        if self.writer is None:
+            await self._open()
+        self.writer.write(payload)
+        status_line = await self.reader.readline()
+        if not status_line:
+            # The server closed an idle keep-alive connection: retry once on a new one
+            self.close()
+            await self._open()
+            self.writer.write(payload)
+            status_line = await self.reader.readline()
+        parts = status_line.split(None, 2)
+        if len(parts) < 2 or not parts[0].startswith(b"HTTP/"):
+            raise ConnectionError(f"Invalid status line: {status_line[:80]!r}")
+        status = int(parts[1])
+
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.partition(b":")
+            headers[name.strip().lower()] = value.strip()
+
+        keep_alive = headers.get(b"connection", b"").lower() != b"close" and parts[0] != b"HTTP/1.0"
+        if is_head or status in (204, 304) or 100 <= status < 200:
+            pass
+        elif headers.get(b"transfer-encoding", b"").lower().endswith(b"chunked"):
+            while True:
+                size = int((await self.reader.readline()).split(b";", 1)[0], 16)
+                if size == 0:
+                    while (await self.reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                await self.reader.readexactly(size + 2)
+        elif b"content-length" in headers:
+            await self.reader.readexactly(int(headers[b"content-length"]))
+        else:
+            await self.reader.read()
+            keep_alive = False
+
+        if not keep_alive:
+            self.close()
+        return status
+
+
+class LoadTester:
+    """
+    HTTP load generator with latency histograms and status-code breakdowns.
+
+    Two modes:
+    - Concurrency (closed loop): `concurrency` connections each send the next request as soon as the previous one completes.
+    - Rate (open loop): requests are started at a fixed rate over up to `concurrency` connections. Latency is measured
+      from the moment each request was scheduled, so server stalls are not hidden by the client waiting (coordinated omission).
+      Requests still waiting for a free connection when the duration elapses are not sent and are reported as dropped.
+
+    Only completed responses are recorded in the latency histogram; errors and timeouts are counted separately.
+    In concurrency mode a connection whose connects keep failing backs off exponentially instead of spinning.
+
+    Usage example:
+    tester = LoadTester("http://127.0.0.1:8080/health", concurrency=50, duration=10)
+    asyncio.run(tester.run())
+    tester.print_report()
+    """
+
+    def __init__(self, url, concurrency=DEFAULT_CONCURRENCY, rate=None, duration=DEFAULT_DURATION, requests=None,
+                 method="GET", headers=None, body=None, timeout=DEFAULT_TIMEOUT, silent=False):
+        """
+        :param url: Target URL (http or https).
+        :param concurrency: Number of connections.
+        :param rate: Target requests per second (open loop). Concurrency mode is used when omitted.
+        :param duration: Seconds to run.
+        :param requests: Stop after this many requests (before `duration` if reached first).
+        :param method: HTTP method.
+        :param headers: List of "Name: value" strings.
+        :param body: Request body (string).
+        :param timeout: Seconds before a request is counted as an error.
+        :param silent: Do not print progress.
+        """
+        parsed = urlsplit(url)
+        if parsed.scheme not in ("http", "https") or not parsed.hostname:
+            raise ValueError(f"The provided URL ({url}) is not valid.")
+        self.url = url
+        self.host = parsed.hostname
+        self.port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        self.use_ssl = parsed.scheme == "https"
+        self.concurrency = concurrency
+        self.rate = rate
+        self.duration = duration
+        self.requests = requests
+        self.method = method.upper()
+        self.timeout = timeout
+        self.silent = silent
+
+        # The request bytes never change, so they are encoded once
+        path = parsed.path or "/"
+        if parsed.query:
+            path = f"{path}?{parsed.query}"
+        host_header = parsed.netloc.rsplit("@", 1)[-1]
+        body_bytes = body.encode("utf-8") if body else b""
+        lines = [f"{self.method} {path} HTTP/1.1", f"Host: {host_header}", "User-Agent: load_test.py", "Accept: */*"]
+        lines.extend(headers or [])
+        if body_bytes or self.method in ("POST", "PUT", "PATCH"):
+            lines.append(f"Content-Length: {len(body_bytes)}")
+        self.payload = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body_bytes
+
+        self.histogram = LatencyHistogram()
+        self.statuses = Counter()
+        self.errors = Counter()
+        self.started = 0
+        self.completed = 0  # Responses and errors
+        self.dropped = 0  # Open loop: scheduled but never sent before the deadline
+        self.elapsed = 0.0
+        self.connections = []
+
+    def _new_connection(self):
+        connection = HttpConnection(self.host, self.port, self.use_ssl, self.timeout)
+        self.connections.append(connection)
+        return connection
+
+    async def _send(self, connection, scheduled):
+        try:
+            status = await connection.request(self.payload, self.method == "HEAD")
+        except asyncio.TimeoutError:
+            self.errors["timeout"] += 1
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError) as e:
+            self.errors[type(e).__name__] += 1
+        else:
+            # Failures return early (refused) or late (timeout), so they would skew the percentiles either way
+            self.statuses[status] += 1
+            self.histogram.record((time.perf_counter() - scheduled) * 1e6)
+        self.completed += 1
+
+    def _has_budget(self, deadline):
+        return time.perf_counter() < deadline and (self.requests is None or self.started < self.requests)
+
+    async def _closed_loop_worker(self, deadline):
+        connection = self._new_connection()
+        while self._has_budget(deadline):
+            self.started += 1
+            await self._send(connection, time.perf_counter())
+            # A refused connect fails in microseconds: back off instead of reporting thousands of errors per second
+            failures = connection.connect_failures - CONNECT_FAILURES_BEFORE_BACKOFF
+            if failures >= 0:
+                backoff = min(MAX_CONNECT_BACKOFF, 0.01 * 2 ** failures)
+                await asyncio.sleep(max(0.0, min(backoff, deadline - time.perf_counter())))
+
+    async def _open_loop(self, deadline):
+        idle = asyncio.Queue()
+        for _ in range(self.concurrency):
+            idle.put_nowait(self._new_connection())
+        in_flight = set()
+        waiting = set()  # Tasks that have not got a connection yet
+
+        async def send_scheduled(scheduled):
+            connection = await idle.get()
+            waiting.discard(asyncio.current_task())
+            try:
+                await self._send(connection, scheduled)
+            finally:
+                idle.put_nowait(connection)
+
+        start = time.perf_counter()
+        while self._has_budget(deadline):
+            # Start every request that is due; latency counts from its scheduled time, not from when a connection freed up
+            due = int((time.perf_counter() - start) * self.rate) + 1
+            while self.started < due and (self.requests is None or self.started < self.requests):
+                task = asyncio.ensure_future(send_scheduled(start + self.started / self.rate))
+                in_flight.add(task)
+                waiting.add(task)
+                task.add_done_callback(in_flight.discard)
+                self.started += 1
+            await asyncio.sleep(max(0.0, min(0.001, start + self.started / self.rate - time.perf_counter())))
+
+        # Queued requests may still get a connection until the deadline; past it they are dropped, not sent late.
+        # Requests already on the wire are awaited (each is bounded by the request timeout).
+        if in_flight:
+            await asyncio.wait(in_flight, timeout=max(0.0, deadline - time.perf_counter()))
+        for task in waiting:
+            task.cancel()
+        self.dropped += len(waiting)
+        waiting.clear()
+        if in_flight:
+            await asyncio.gather(*in_flight, return_exceptions=True)
+
+    async def _progress(self):
+        while True:
+            await asyncio.sleep(1)
+            succeeded = self.histogram.total
+            elapsed = time.perf_counter() - self._start
+            sys.stdout.write(f"\rResponses: {succeeded} | {succeeded / elapsed:,.0f} req/s | p99: {self.histogram.percentile(99) / 1000:.2f} ms | Errors: {sum(self.errors.values())}")
+            sys.stdout.flush()
+
+    async def run(self):
+        """
+        Run the load test until the duration elapses or the request budget is spent.
+        """
+        self._start = time.perf_counter()
+        deadline = self._start + self.duration
+        progress = None if self.silent else asyncio.ensure_future(self._progress())
+        try:
+            if self.rate:
+                await self._open_loop(deadline)
+            else:
+                await asyncio.gather(*(self._closed_loop_worker(deadline) for _ in range(self.concurrency)))
+        finally:
+            self.elapsed = time.perf_counter() - self._start
+            if progress is not None:
+                progress.cancel()
+                sys.stdout.write("\n")
+            for connection in self.connections:
+                connection.close()
+
+    def report(self):
+        """
+        Get the results as a dictionary (latencies in milliseconds).
+        """
+        return {
+            "requests": self.completed,
+            "succeeded": self.histogram.total,
+            "failed": sum(self.errors.values()),
+            "dropped": self.dropped,
+            "elapsed_s": self.elapsed,
+            "requests_per_s": self.histogram.total / self.elapsed if self.elapsed else 0.0,  # Successful responses only
+            "connections_opened": sum(connection.connects for connection in self.connections),
+            "statuses": dict(sorted(self.statuses.items())),
+            "errors": dict(self.errors),
+            "latency_ms": {
+                "min": (self.histogram.min or 0) / 1000,
+                "mean": self.histogram.mean() / 1000,
+                "p50": self.histogram.percentile(50) / 1000,
+                "p90": self.histogram.percentile(90) / 1000,
+                "p99": self.histogram.percentile(99) / 1000,
+                "p99.9": self.histogram.percentile(99.9) / 1000,
+                "max": self.histogram.max / 1000,
+            },
+        }
+
+    def print_report(self):
+        """
+        Print the results: throughput, latency percentiles and status-code counts.
+        """
+        report = self.report()
+        color = GREEN if report["succeeded"] else RED
+        print(f"{color}{report['succeeded']} responses, {report['failed']} failed requests in {report['elapsed_s']:.2f} s ({report['requests_per_s']:,.0f} responses/s) over {report['connections_opened']} connections{NC}")
+        if report["dropped"]:
+            print(f"{RED}{report['dropped']} requests dropped: no free connection before the duration elapsed (raise --concurrency){NC}")
+        if report["succeeded"]:
+            print("Latency (completed responses):")
+            for name, value in report["latency_ms"].items():
+                print(f"\t{name}\t{value:.3f} ms")
+        else:
+            print(f"{RED}No request completed: no latency to report{NC}")
+        print("Status codes:")
+        for status, count in report["statuses"].items():
+            color = RED if 500 <= status < 600 else ""
+            print(f"{color}\tHTTP {status}\t{count}{NC if color else ''}")
+        for error, count in report["errors"].items():
+            print(f"{RED}\t{error}\t{count}{NC}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTTP load test with keep-alive connections and latency percentiles.")
+    parser.add_argument("url", help="Target URL (http or https)")
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Number of connections")
+    parser.add_argument("-r", "--rate", type=float, help="Target requests per second (default: as fast as the connections allow)")
+    parser.add_argument("-d", "--duration", type=float, default=DEFAULT_DURATION, help="Seconds to run")
+    parser.add_argument("-n", "--requests", type=int, help="Stop after this many requests")
+    parser.add_argument("-X", "--method", default="GET", help="HTTP method")
+    parser.add_argument("-H", "--header", action="append", default=[], help="Extra header, e.g. 'Authorization: Bearer x' (repeatable)")
+    parser.add_argument("--body", help="Request body")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Seconds before a request counts as an error")
+    parser.add_argument("--silent", action="store_true", help="Do not print progress")
+    args = parser.parse_args()
+
+    if args.concurrency < 1 or (args.rate is not None and args.rate <= 0) or args.duration <= 0 or (args.requests is not None and args.requests < 1):
+        parser.error("--concurrency, --rate, --duration and --requests must be positive")
+
+    try:
+        tester = LoadTester(
+            args.url,
+            concurrency=args.concurrency,
+            rate=args.rate,
+            duration=args.duration,
+            requests=args.requests,
+            method=args.method,
+            headers=args.header,
+            body=args.body,
+            timeout=args.timeout,
+            silent=args.silent,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    asyncio.run(tester.run())
+    tester.print_report()